@@ -0,0 +1,39 @@
+# Copyright (c) 2022 Andy Kee
+
+# Ahead-of-time compile the numeric kernels in loot/_kernels.py into the
+# optional loot._kernels_aot extension so importing loot never pays numba's
+# JIT compile cost. Building it is opt-in and requires numba and a C
+# compiler. Either build it in place:
+#
+#   python build_kernels.py
+#
+# or have setup.py build it during installation:
+#
+#   LOOT_BUILD_KERNELS=1 pip install --no-build-isolation .
+#
+# Note that numba.pycc is pending deprecation in numba. Without the extension
+# loot falls back to JIT compiling the kernels with numba when it is
+# installed, or to running them as plain Python.
+
+import importlib.util
+import os
+
+from numba.pycc import CC
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# Load _kernels.py directly so the build doesn't import the loot package
+spec = importlib.util.spec_from_file_location(
+    '_kernels', os.path.join(here, 'loot', '_kernels.py'))
+_kernels = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(_kernels)
+
+cc = CC('_kernels_aot')
+cc.output_dir = os.path.join(here, 'loot')
+
+cc.export('ibnd_accumulate', 'f8[:](f8, f8[:,:])')(_kernels.ibnd_accumulate)
+cc.export('ldf_kernel', 'Tuple((f8, f8[:], f8[:], f8[:]))(f8, i8, f8)')(_kernels.ldf_kernel)
+
+
+if __name__ == '__main__':
+    cc.compile()
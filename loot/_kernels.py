@@ -0,0 +1,76 @@
+# Copyright (c) 2022 Andy Kee
+
+# Numeric kernels written in the subset of Python that numba can compile.
+# They are compiled ahead of time by build_kernels.py, or just in time by
+# loot.loot when the compiled extension isn't available. This module must
+# only depend on numpy so the build script can import it standalone.
+
+import numpy as np
+
+
+def ibnd_accumulate(prin, rate_schedule):
+    """Compound I bond value month by month
+
+    Parameters
+    ----------
+    prin : float
+        Original bond purchase
+    rate_schedule : ndarray
+        (n, 2) array of (fixed, floating) rates for each month
+
+    Returns
+    -------
+    val : ndarray
+        Bond value at purchase and after each of the n months
+
+    """
+    n = rate_schedule.shape[0]
+    out = np.empty(n+1)
+    out[0] = prin
+    for i in range(n):
+        fixed, floating = rate_schedule[i, 0], rate_schedule[i, 1]
+        composite_rate = fixed + (2*floating) + (fixed * floating)
+        out[i+1] = out[i] * (1 + composite_rate/12)
+    return out
+
+
+def ldf_kernel(r, n, prin):
+    """Compute a loan amortization schedule in a single pass
+
+    Parameters
+    ----------
+    r : float
+        Monthly interest rate
+    n : int
+        Loan term (months)
+    prin : float
+        Loan principal
+
+    Returns
+    -------
+    pmt : float
+        Monthly payment
+    principal : ndarray
+        Monthly principal payment
+    interest : ndarray
+        Monthly interest payment
+    balance : ndarray
+        Loan balance after each payment
+
+    """
+    if r == 0:
+        pmt = prin/n
+    else:
+        c = (1+r)**n
+        pmt = prin*r*c/(c-1)
+
+    principal = np.empty(n)
+    interest = np.empty(n)
+    balance = np.empty(n)
+    bal = prin
+    for i in range(n):
+        interest[i] = bal*r
+        principal[i] = pmt - interest[i]
+        bal -= principal[i]
+        balance[i] = bal
+    return pmt, principal, interest, balance
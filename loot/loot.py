@@ -1,34 +1,94 @@
 # Copyright (c) 2022 Andy Kee
 
+import bisect
+import calendar
 import datetime
 
 import pandas as pd
 import numpy as np
-import numpy_financial as npf
-from dateutil.relativedelta import relativedelta
 
 from loot.rates import USTAX, CATAX, STDED, IBND
 
-# Reworked interfaces for useful numpy-financial functions
+# Prefer the ahead-of-time compiled kernels built by build_kernels.py,
+# then JIT compiling with numba, then plain Python. numba is only imported
+# when the compiled extension isn't available.
+try:
+    from loot._kernels_aot import ibnd_accumulate as _ibnd_accumulate
+    from loot._kernels_aot import ldf_kernel as _ldf_kernel
+except ImportError:
+    from loot import _kernels
+    try:
+        from numba import njit
+    except ImportError:
+        _ibnd_accumulate = _kernels.ibnd_accumulate
+        _ldf_kernel = _kernels.ldf_kernel
+    else:
+        _ibnd_accumulate = njit(cache=True)(_kernels.ibnd_accumulate)
+        _ldf_kernel = njit(cache=True)(_kernels.ldf_kernel)
+
+
+def _unbox(x):
+    # Return numpy scalars as Python floats, leaving arrays untouched
+    return float(x) if isinstance(x, np.generic) else x
+
+
+def _ibnd_period(ym):
+    # Index of the May/November I bond rate period containing month ym,
+    # where ym = year*12 + (month-1)
+    return (ym - 4) // 6
+
+
+def _ibnd_rates():
+    # (fixed, floating) rates as a contiguous array indexed by rate period
+    # relative to the first period in IBND
+    periods = [_ibnd_period(int(d[:4])*12 + int(d[5:7]) - 1) for d in IBND]
+    start = min(periods)
+    rates = np.full((max(periods) - start + 1, 2), np.nan)
+    for period, rate in zip(periods, IBND.values()):
+        rates[period - start] = rate
+    return start, rates
+
+
+_IBND_START, _IBND_RATES = _ibnd_rates()
+
+# Loan payment and future value functions
 def pmt(rate, nper, prin):
     """Compute monthly loan payment (principal + interest)
 
     Parameters
     ----------
-    rate : float
+    rate : float or array_like
         Interest rate (APR)
-    nper : int
+    nper : int or array_like
         Loan term (months)
-    prin : float
+    prin : float or array_like
         Loan principal
 
     Returns
     -------
-    pmt : float
+    pmt : float or ndarray
         Monthly payment
 
     """
-    return -npf.pmt(rate=rate/12, nper=nper, pv=prin)
+    if np.isscalar(rate) and np.isscalar(nper) and np.isscalar(prin):
+        return _pmt_scalar(rate, nper, prin)
+    return _pmt_array(np.asarray(rate), np.asarray(nper), np.asarray(prin))
+
+
+def _pmt_scalar(rate, nper, prin):
+    r = rate/12
+    if r == 0:
+        return prin/nper
+    c = (1+r)**nper
+    return prin*r*c/(c-1)
+
+
+def _pmt_array(rate, nper, prin):
+    # Both branches are evaluated, so silence the zero rate division
+    r = rate/12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = (1+r)**nper
+        return np.where(r == 0, prin/nper, prin*r*c/(c-1))
 
 
 def ppmt(rate, per, nper, prin):
@@ -51,7 +111,8 @@ def ppmt(rate, per, nper, prin):
         Monthly principal payment
 
     """
-    return -npf.ppmt(rate=rate/12, per=per, nper=nper, pv=prin)
+    payment = pmt(rate, nper, prin)
+    return payment - _ipmt(rate, per, nper, prin, payment)
 
 
 def ipmt(rate, per, nper, prin):
@@ -74,7 +135,30 @@ def ipmt(rate, per, nper, prin):
         Monthly interest payment
 
     """
-    return -npf.ipmt(rate=rate/12, per=per, nper=nper, pv=prin)
+    return _ipmt(rate, per, nper, prin, pmt(rate, nper, prin))
+
+
+def _ipmt(rate, per, nper, prin, payment):
+    # Shared by ipmt and ppmt so the payment is only computed once. Interest
+    # accrues on the balance remaining after the previous period.
+    if not np.isscalar(rate):
+        return _ipmt_array(np.asarray(rate), np.asarray(per), nper, prin, payment)
+
+    r = rate/12
+    if not np.isscalar(per):
+        per = np.asarray(per)
+    if r == 0:
+        return 0.0 if np.isscalar(per) else np.zeros(per.shape)
+    c = (1+r)**(per-1)
+    return (prin*c - payment*(c-1)/r)*r
+
+
+def _ipmt_array(rate, per, nper, prin, payment):
+    # Both branches are evaluated, so silence the zero rate division
+    r = rate/12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = (1+r)**(per-1)
+        return np.where(r == 0, 0.0, (prin*c - payment*(c-1)/r)*r)
 
 
 def fv(rate, nper, prin, pmt=0):
@@ -82,22 +166,42 @@ def fv(rate, nper, prin, pmt=0):
 
     Parameters
     ----------
-    rate : float
+    rate : float or array_like
         Interest rate (APY)
-    nper : int
+    nper : int or array_like
         Number of compounding months
-    prin : float
+    prin : float or array_like
         Present value
-    pmt : float, optional
+    pmt : float or array_like, optional
         Additional monthly principal
 
     Returns
     -------
-    fv : float
+    fv : float or ndarray
         Future value
 
     """
-    return npf.fv(rate=rate/12, nper=nper, pv=-prin, pmt=-pmt)
+    # Only rate decides the branch, the other arguments broadcast either way
+    if np.isscalar(rate):
+        return _unbox(_fv_scalar(rate, nper, prin, pmt))
+    return _fv_array(np.asarray(rate), np.asarray(nper), np.asarray(prin),
+                     np.asarray(pmt))
+
+
+def _fv_scalar(rate, nper, prin, pmt):
+    r = rate/12
+    if r == 0:
+        return prin + pmt*nper
+    c = (1+r)**nper
+    return prin*c + pmt*(c-1)/r
+
+
+def _fv_array(rate, nper, prin, pmt):
+    # Both branches are evaluated, so silence the zero rate division
+    r = rate/12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c = (1+r)**nper
+        return np.where(r == 0, prin + pmt*nper, prin*c + pmt*(c-1)/r)
 
 
 def bal(rate, per, nper, prin):
@@ -120,32 +224,42 @@ def bal(rate, per, nper, prin):
         Current loan balance
 
     """
-    l = ldf(rate, nper, prin)
-    return l.at[per, 'Balance']
+    # The balance is the future value of the principal less the payments made
+    return round(fv(rate, per, prin, -pmt(rate, nper, prin)), 2)
 
 
 def ldf(rate, nper, prin, round=2, start_date=None):
     """Create a loan dataframe
 
     """
-    df = pd.DataFrame(index=np.arange(1, nper+1), columns=['Payment', 'Principal', 'Interest', 'Balance'])
-    df.index.name = 'Month'
+    if nper != int(nper):
+        raise ValueError(f'nper must be a whole number of months, got {nper}')
+    nper = int(nper)
+
+    payment_val, principal, interest, balance = _ldf_kernel(rate/12, nper, prin)
+
+    # Round the freshly computed arrays in place rather than the whole frame
+    payment = np.full(nper, np.round(payment_val, round))
+    for col in (principal, interest, balance):
+        np.round(col, round, out=col)
+
+    df = pd.DataFrame({'Payment': payment,
+                       'Principal': principal,
+                       'Interest': interest,
+                       'Balance': balance},
+                      index=pd.RangeIndex(1, nper+1, name='Month'),
+                      dtype=np.float64)
 
     if start_date:
-        start = pd.date_range(start=start_date, end=start_date, periods=1)
-        year, month, day = start[0].year, start[0].month, start[0].day
-        offset = day - 1
-
-        ts = pd.date_range(start=f'{month}/1/{year}', periods=nper, freq='MS')
-        ts += (day-1) * pd.offsets.Day()
-        df.insert(0, 'Date', ts)
-
-    df['Payment'] = pmt(rate=rate, nper=nper, prin=prin)
-    df['Principal'] = ppmt(rate=rate, per=df.index, nper=nper, prin=prin)
-    df['Interest'] = ipmt(rate=rate, per=df.index, nper=nper, prin=prin)
-    df['Balance'] = prin - df['Principal'].cumsum()
-    df = df.round(round)
-    
+        # Payments fall the same number of days into each month as start_date
+        start = pd.Timestamp(start_date).to_datetime64()
+        day = start.astype('datetime64[D]')
+        month = day.astype('datetime64[M]')
+        months = month + np.arange(nper, dtype='timedelta64[M]')
+        ts = months.astype('datetime64[D]') + (day - month.astype('datetime64[D]'))
+        # Keep the resolution pandas gives parsed timestamps
+        df.insert(0, 'Date', pd.DatetimeIndex(ts.astype(start.dtype)))
+
     return df
 
 
@@ -154,26 +268,58 @@ def itax(tinc, table):
 
     Parameters
     ----------
-    tinc : float
+    tinc : float or array_like
         Taxable income
     table: dict
         Tax table 
 
     Returns
     -------
-    itax : float
+    itax : float or ndarray
         Income tax owed
 
     """
-    tax = 0
-    brackets = list(table.keys())
-    for n, bracket in enumerate(brackets):
-        if tinc > brackets[n+1]:
-            tax += (brackets[n+1] - brackets[n]) * table[bracket]
-        else:
-            tax += (tinc - brackets[n]) * table[bracket]
-            break
-    return round(tax, 2)
+    thresholds, rates, cum_tax, arrays = _itax_table(table)
+    if isinstance(tinc, (int, float, np.number)):
+        i = bisect.bisect_right(thresholds, tinc) - 1
+        if i < 0:
+            i = 0
+        return round(float(cum_tax[i] + (tinc - thresholds[i]) * rates[i]), 2)
+
+    thresholds, rates, cum_tax = arrays
+    tinc = np.asarray(tinc, dtype=np.float64)
+    i = np.maximum(np.searchsorted(thresholds, tinc, side='right') - 1, 0)
+    return np.round(cum_tax[i] + (tinc - thresholds[i]) * rates[i], 2)
+
+
+def _itax_table(table):
+    # Bracket thresholds, rates, and the tax owed at each threshold, as
+    # Python lists for scalar lookups and read-only arrays for vectorized
+    # ones. Entries are found by table identity and rebuilt if the table has
+    # been edited since it was cached.
+    entry = _ITAX_TABLES.get(id(table))
+    if entry is not None and entry[0] is table and entry[1] == table:
+        return entry[2]
+
+    thresholds = sorted(table)
+    rates = [table[b] for b in thresholds]
+    cum_tax = [0.0]
+    for n in range(1, len(thresholds)):
+        cum_tax.append(cum_tax[-1] + (thresholds[n] - thresholds[n-1]) * rates[n-1])
+    arrays = tuple(np.array(x, dtype=np.float64) for x in (thresholds, rates, cum_tax))
+    for arr in arrays:
+        arr.flags.writeable = False
+    brackets = (thresholds, rates, cum_tax, arrays)
+
+    if len(_ITAX_TABLES) >= 64:
+        # Evict the oldest entry so sweeps over ad hoc tables stay bounded
+        del _ITAX_TABLES[next(iter(_ITAX_TABLES))]
+    # Hold a reference to table so its id can't be reused while cached
+    _ITAX_TABLES[id(table)] = (table, dict(table), brackets)
+    return brackets
+
+
+_ITAX_TABLES = {}
 
 
 def ustax(tinc, fstatus='MFJ', year=None):
@@ -181,7 +327,7 @@ def ustax(tinc, fstatus='MFJ', year=None):
 
     Parameters
     ----------
-    tinc : float
+    tinc : float or array_like
         Taxable income
     fstatus: str
         Filing status. Current support for married filing jointly
@@ -189,7 +335,7 @@ def ustax(tinc, fstatus='MFJ', year=None):
 
     Returns
     -------
-    itax : float
+    itax : float or ndarray
         Income tax owed
 
     """
@@ -203,7 +349,7 @@ def catax(tinc, fstatus='MFJ', year=None):
 
     Parameters
     ----------
-    tinc : float
+    tinc : float or array_like
         Taxable income
     fstatus: str
         Filing status. Current support for married filing jointly
@@ -211,7 +357,7 @@ def catax(tinc, fstatus='MFJ', year=None):
 
     Returns
     -------
-    itax : float
+    itax : float or ndarray
         Income tax owed
 
     """
@@ -222,22 +368,17 @@ def catax(tinc, fstatus='MFJ', year=None):
 
 def dedmint(rate, nper, prin, round=2):
     prin = 750000 if prin > 750000 else prin
-    df = ldf(rate=rate, nper=nper, prin=prin, round=round)
-    
-    mint = []
-    for year in _chunker(df, 12):
-        mint.append(year['Interest'].sum())
+    interest = np.round(ipmt(rate, np.arange(1, nper+1), nper, prin), round)
+
+    # Pad a partial final year with zeros and sum each year's interest
+    years = -(-nper // 12)
+    interest = np.pad(interest, (0, years*12 - nper)).reshape(years, 12).sum(axis=1)
 
-    df = pd.DataFrame(index=np.arange(1, len(mint)+1), columns=['Interest'])
+    df = pd.DataFrame({'Interest': interest}, index=np.arange(1, years+1))
     df.index.name = 'Year'
-    df['Interest'] = mint
     df = df.round(round)
     return df
 
-    
-def _chunker(seq, size):
-    return (seq[pos:pos + size] for pos in range(0, len(seq), size))
-
 
 def hoins(val, pct=0.0025):
     """Estimate annual homeowner's insurance payment
@@ -255,7 +396,7 @@ def hoins(val, pct=0.0025):
         Estimated annual cost
 
     """
-    return val * pct
+    return _unbox(val * pct)
 
 
 def ptax(val, rate=0.0127):
@@ -274,7 +415,7 @@ def ptax(val, rate=0.0127):
         Annual property tax
 
     """
-    return val * rate
+    return _unbox(val * rate)
 
 
 def stded(fstatus='MFJ', year=None):
@@ -314,30 +455,26 @@ def ibnd(pdate, prin, date=None, early_penalty=True):
     * Bonds held less than 5 years forefit the last 3 months of interest
 
     """
-    prin = [prin]
     pdate = datetime.date.fromisoformat(pdate)
-    rdate = _rate_date(pdate)
-    fixed_rate = IBND[rdate][0]
+    period = _ibnd_period(pdate.year*12 + pdate.month - 1) - _IBND_START
 
     # redemption date (really month)
     redate = datetime.date.today() if date is None else datetime.date.fromisoformat(date)
-    redate.replace(day=1)
-    
-  
+    n = _months_between(pdate, redate)
 
-    date = pdate
-    m = 1
+    # The floating rate resets every six months from the purchase date
+    periods = period + np.arange(n) // 6
+    if period < 0 or period + max(n-1, 0)//6 >= len(_IBND_RATES):
+        raise KeyError('I bond rates are not available for the requested dates')
 
-    while date < redate:
-        floating_rate = IBND[rdate][1]
-        composite_rate = fixed_rate + (2*floating_rate) + (fixed_rate * floating_rate)
-        prin.append(fv(composite_rate, 1, prin[-1]))
-        date += relativedelta(months=1)
-        m += 1
+    rate_schedule = np.empty((n, 2))
+    rate_schedule[:, 0] = _IBND_RATES[period, 0]
+    rate_schedule[:, 1] = _IBND_RATES[periods, 1]
+    # Periods missing from IBND are NaN in the table
+    if np.isnan(_IBND_RATES[period, 0]) or np.isnan(rate_schedule).any():
+        raise KeyError('I bond rates are not available for the requested dates')
 
-        if m > 6:
-            rdate = _rate_date(date)
-            m = 1    
+    prin = _ibnd_accumulate(prin, rate_schedule)
 
     if early_penalty:
         # Forefit last 3 months of interest if held less than 5 years
@@ -348,16 +485,20 @@ def ibnd(pdate, prin, date=None, early_penalty=True):
     # Bonds are rounded to the nearest $4 when redeemed
     rem = val % 4
     val = val - rem if rem < 2 else val - rem + 4
-    return val
+    return float(val)
+
+
+def _months_between(start, end):
+    # Number of monthly steps from start that fall before end
+    n = (end.year - start.year)*12 + end.month - start.month
+    if n < 0:
+        return 0
+    day = start.day
+    if day > 28:
+        # Stepping by month clamps the day to the end of shorter months and
+        # the clamped day carries forward
+        ym = start.year*12 + start.month - 1
+        for m in range(ym+1, ym+n+1):
+            day = min(day, calendar.monthrange(m//12, m%12 + 1)[1])
+    return n + 1 if day < end.day else n
 
-
-def _rate_date(pdate):
-    rate_year = pdate.year
-    if pdate.month < 5:
-        rate_month = 11
-        rate_year -= 1
-    elif pdate.month < 11:
-        rate_month = 5
-    else:
-        rate_month = 11
-    return datetime.date(rate_year, rate_month, 1).strftime('%Y-%m-%d')
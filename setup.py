@@ -1,17 +1,54 @@
+import os
 import re
+import sys
+import warnings
 
 from setuptools import setup
+from setuptools.command.build_ext import build_ext
 
 with open('loot/__init__.py') as f:
     version = re.search('__version__ = "(.*?)"', f.read()).group(1)
 
+# Ahead-of-time compiling the numeric kernels is opt-in, see build_kernels.py.
+# Without the extension loot falls back to JIT compiled or plain Python
+# kernels.
+ext_modules = []
+if os.environ.get('LOOT_BUILD_KERNELS'):
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    try:
+        from build_kernels import cc
+    except Exception as err:
+        # numba missing, or no C compiler for it to use
+        warnings.warn(f'Skipping loot._kernels_aot: {err}')
+    else:
+        ext = cc.distutils_extension()
+        ext.name = 'loot.' + cc.name
+        ext_modules.append(ext)
+    finally:
+        sys.path.pop(0)
+
+
+class optional_build_ext(build_ext):
+    # The compiled kernels are optional, so a failed build shouldn't fail
+    # the install
+    def build_extension(self, ext):
+        try:
+            super().build_extension(ext)
+        except Exception as err:
+            warnings.warn(f'Skipping {ext.name}: {err}')
+
+
 setup(
     name='loot',
     version=version,
+    packages=['loot'],
+    ext_modules=ext_modules,
+    cmdclass={'build_ext': optional_build_ext},
     install_requires=[
         'pandas',
-        'numpy',
-        'numpy-financial',
-        'python-dateutil'
-    ]
+        'numpy'
+    ],
+    extras_require={
+        'numba': ['numba']
+    }
 )
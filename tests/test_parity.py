@@ -0,0 +1,249 @@
+# Copyright (c) 2022 Andy Kee
+
+# Parity checks against numpy-financial, which loot's loan functions used to
+# wrap. Reference values were generated with numpy-financial and are
+# hardcoded so it isn't a dependency. numpy-financial returns nan for ipmt
+# at a zero rate, so those references are the exact value 0.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import loot
+
+PMT = [
+    (0, 12, 1000.0, 83.33333333333333),
+    (0, 12, 250000.0, 20833.333333333332),
+    (0, 360, 1000.0, 2.7777777777777777),
+    (0, 360, 250000.0, 694.4444444444445),
+    (0.035, 12, 1000.0, 84.92162984406757),
+    (0.035, 12, 250000.0, 21230.407461016894),
+    (0.035, 360, 1000.0, 4.4904468780882345),
+    (0.035, 360, 250000.0, 1122.6117195220586),
+    (0.0675, 12, 1000.0, 86.41153880829715),
+    (0.0675, 12, 250000.0, 21602.884702074287),
+    (0.0675, 360, 1000.0, 6.485980965682156),
+    (0.0675, 360, 250000.0, 1621.4952414205393),
+]
+
+IPMT = [
+    (0, 1, 12, 1000.0, 0.0),
+    (0, 6, 12, 1000.0, 0.0),
+    (0, 12, 12, 1000.0, 0.0),
+    (0, 1, 12, 250000.0, 0.0),
+    (0, 6, 12, 250000.0, 0.0),
+    (0, 12, 12, 250000.0, 0.0),
+    (0, 1, 360, 1000.0, 0.0),
+    (0, 6, 360, 1000.0, 0.0),
+    (0, 360, 360, 1000.0, 0.0),
+    (0, 1, 360, 250000.0, 0.0),
+    (0, 6, 360, 250000.0, 0.0),
+    (0, 360, 360, 250000.0, 0.0),
+    (0.035, 1, 12, 1000.0, 2.916666666666667),
+    (0.035, 6, 12, 1000.0, 1.7137644603067614),
+    (0.035, 12, 12, 1000.0, 0.246967764399027),
+    (0.035, 1, 12, 250000.0, 729.1666666666667),
+    (0.035, 6, 12, 250000.0, 428.4411150766903),
+    (0.035, 12, 12, 250000.0, 61.74194109975658),
+    (0.035, 1, 360, 1000.0, 2.916666666666667),
+    (0.035, 6, 360, 1000.0, 2.8935814335869416),
+    (0.035, 360, 360, 1000.0, 0.013059047838230147),
+    (0.035, 1, 360, 250000.0, 729.1666666666667),
+    (0.035, 6, 360, 250000.0, 723.3953583967354),
+    (0.035, 360, 360, 250000.0, 3.2647619595579456),
+    (0.0675, 1, 12, 1000.0, 5.625000000000001),
+    (0.0675, 6, 12, 1000.0, 3.3271730426955046),
+    (0.0675, 12, 12, 1000.0, 0.48334608407376006),
+    (0.0675, 1, 12, 250000.0, 1406.2500000000002),
+    (0.0675, 6, 12, 250000.0, 831.7932606738759),
+    (0.0675, 12, 12, 250000.0, 120.83652101843978),
+    (0.0675, 1, 360, 1000.0, 5.625000000000001),
+    (0.0675, 6, 360, 1000.0, 5.600510953905761),
+    (0.0675, 360, 360, 1000.0, 0.03627957034874953),
+    (0.0675, 1, 360, 250000.0, 1406.2500000000002),
+    (0.0675, 6, 360, 250000.0, 1400.12773847644),
+    (0.0675, 360, 360, 250000.0, 9.06989258718546),
+]
+
+PPMT = [
+    (0, 1, 12, 1000.0, 83.33333333333333),
+    (0, 6, 12, 1000.0, 83.33333333333333),
+    (0, 12, 12, 1000.0, 83.33333333333333),
+    (0, 1, 12, 250000.0, 20833.333333333332),
+    (0, 6, 12, 250000.0, 20833.333333333332),
+    (0, 12, 12, 250000.0, 20833.333333333332),
+    (0, 1, 360, 1000.0, 2.7777777777777777),
+    (0, 6, 360, 1000.0, 2.7777777777777777),
+    (0, 360, 360, 1000.0, 2.7777777777777777),
+    (0, 1, 360, 250000.0, 694.4444444444445),
+    (0, 6, 360, 250000.0, 694.4444444444445),
+    (0, 360, 360, 250000.0, 694.4444444444445),
+    (0.035, 1, 12, 1000.0, 82.0049631774009),
+    (0.035, 6, 12, 1000.0, 83.2078653837608),
+    (0.035, 12, 12, 1000.0, 84.67466207966854),
+    (0.035, 1, 12, 250000.0, 20501.240794350226),
+    (0.035, 6, 12, 250000.0, 20801.966345940204),
+    (0.035, 12, 12, 250000.0, 21168.665519917136),
+    (0.035, 1, 360, 1000.0, 1.5737802114215675),
+    (0.035, 6, 360, 1000.0, 1.5968654445012929),
+    (0.035, 360, 360, 1000.0, 4.477387830250004),
+    (0.035, 1, 360, 250000.0, 393.44505285539185),
+    (0.035, 6, 360, 250000.0, 399.21636112532315),
+    (0.035, 360, 360, 250000.0, 1119.3469575625006),
+    (0.0675, 1, 12, 1000.0, 80.78653880829715),
+    (0.0675, 6, 12, 1000.0, 83.08436576560165),
+    (0.0675, 12, 12, 1000.0, 85.9281927242234),
+    (0.0675, 1, 12, 250000.0, 20196.634702074287),
+    (0.0675, 6, 12, 250000.0, 20771.09144140041),
+    (0.0675, 12, 12, 250000.0, 21482.04818105585),
+    (0.0675, 1, 360, 1000.0, 0.8609809656821552),
+    (0.0675, 6, 360, 1000.0, 0.8854700117763947),
+    (0.0675, 360, 360, 1000.0, 6.449701395333406),
+    (0.0675, 1, 360, 250000.0, 215.24524142053906),
+    (0.0675, 6, 360, 250000.0, 221.36750294409921),
+    (0.0675, 360, 360, 250000.0, 1612.4253488333538),
+]
+
+FV = [
+    (0, 12, 1000.0, 2200.0),
+    (0, 12, 250000.0, 251200.0),
+    (0, 360, 1000.0, 37000.0),
+    (0, 360, 250000.0, 286000.0),
+    (0.035, 12, 1000.0, 2255.0053396649614),
+    (0.035, 12, 250000.0, 260111.17662321165),
+    (0.035, 360, 1000.0, 66394.56140047907),
+    (0.035, 360, 250000.0, 776863.065534224),
+    (0.0675, 12, 1000.0, 2307.4579200706125),
+    (0.0675, 12, 250000.0, 268644.81412645074),
+    (0.0675, 360, 1000.0, 123679.83173857194),
+    (0.0675, 360, 250000.0, 1999457.9555618844),
+]
+
+BAL = [
+    (0, 1, 12, 1000.0, 916.67),
+    (0, 6, 12, 1000.0, 500.0),
+    (0, 12, 12, 1000.0, 0.0),
+    (0, 1, 12, 250000.0, 229166.67),
+    (0, 6, 12, 250000.0, 125000.0),
+    (0, 12, 12, 250000.0, 0.0),
+    (0, 1, 360, 1000.0, 997.22),
+    (0, 6, 360, 1000.0, 983.33),
+    (0, 360, 360, 1000.0, 0.0),
+    (0, 1, 360, 250000.0, 249305.56),
+    (0, 6, 360, 250000.0, 245833.33),
+    (0, 360, 360, 250000.0, 0.0),
+    (0.035, 1, 12, 1000.0, 918.0),
+    (0.035, 6, 12, 1000.0, 504.37),
+    (0.035, 12, 12, 1000.0, 0.0),
+    (0.035, 1, 12, 250000.0, 229498.76),
+    (0.035, 6, 12, 250000.0, 126092.13),
+    (0.035, 12, 12, 250000.0, 0.0),
+    (0.035, 1, 360, 1000.0, 998.43),
+    (0.035, 6, 360, 1000.0, 990.49),
+    (0.035, 360, 360, 1000.0, 0.0),
+    (0.035, 1, 360, 250000.0, 249606.55),
+    (0.035, 6, 360, 250000.0, 247622.05),
+    (0.035, 360, 360, 250000.0, 0.0),
+    (0.0675, 1, 12, 1000.0, 919.21),
+    (0.0675, 6, 12, 1000.0, 508.41),
+    (0.0675, 12, 12, 1000.0, 0.0),
+    (0.0675, 1, 12, 250000.0, 229803.37),
+    (0.0675, 6, 12, 250000.0, 127103.27),
+    (0.0675, 12, 12, 250000.0, 0.0),
+    (0.0675, 1, 360, 1000.0, 999.14),
+    (0.0675, 6, 360, 1000.0, 994.76),
+    (0.0675, 360, 360, 1000.0, 0.0),
+    (0.0675, 1, 360, 250000.0, 249784.75),
+    (0.0675, 6, 360, 250000.0, 248690.23),
+    (0.0675, 360, 360, 250000.0, 0.0),
+]
+
+LDF = [
+    (0, 1, 12, 1000.0, 83.33, 83.33, 0.0, 916.67),
+    (0, 6, 12, 1000.0, 83.33, 83.33, 0.0, 500.0),
+    (0, 12, 12, 1000.0, 83.33, 83.33, 0.0, 0.0),
+    (0, 1, 12, 250000.0, 20833.33, 20833.33, 0.0, 229166.67),
+    (0, 6, 12, 250000.0, 20833.33, 20833.33, 0.0, 125000.0),
+    (0, 12, 12, 250000.0, 20833.33, 20833.33, 0.0, 0.0),
+    (0, 1, 360, 1000.0, 2.78, 2.78, 0.0, 997.22),
+    (0, 6, 360, 1000.0, 2.78, 2.78, 0.0, 983.33),
+    (0, 360, 360, 1000.0, 2.78, 2.78, 0.0, 0.0),
+    (0, 1, 360, 250000.0, 694.44, 694.44, 0.0, 249305.56),
+    (0, 6, 360, 250000.0, 694.44, 694.44, 0.0, 245833.33),
+    (0, 360, 360, 250000.0, 694.44, 694.44, 0.0, 0.0),
+    (0.035, 1, 12, 1000.0, 84.92, 82.0, 2.92, 918.0),
+    (0.035, 6, 12, 1000.0, 84.92, 83.21, 1.71, 504.37),
+    (0.035, 12, 12, 1000.0, 84.92, 84.67, 0.25, 0.0),
+    (0.035, 1, 12, 250000.0, 21230.41, 20501.24, 729.17, 229498.76),
+    (0.035, 6, 12, 250000.0, 21230.41, 20801.97, 428.44, 126092.13),
+    (0.035, 12, 12, 250000.0, 21230.41, 21168.67, 61.74, 0.0),
+    (0.035, 1, 360, 1000.0, 4.49, 1.57, 2.92, 998.43),
+    (0.035, 6, 360, 1000.0, 4.49, 1.6, 2.89, 990.49),
+    (0.035, 360, 360, 1000.0, 4.49, 4.48, 0.01, 0.0),
+    (0.035, 1, 360, 250000.0, 1122.61, 393.45, 729.17, 249606.55),
+    (0.035, 6, 360, 250000.0, 1122.61, 399.22, 723.4, 247622.05),
+    (0.035, 360, 360, 250000.0, 1122.61, 1119.35, 3.26, 0.0),
+    (0.0675, 1, 12, 1000.0, 86.41, 80.79, 5.63, 919.21),
+    (0.0675, 6, 12, 1000.0, 86.41, 83.08, 3.33, 508.41),
+    (0.0675, 12, 12, 1000.0, 86.41, 85.93, 0.48, 0.0),
+    (0.0675, 1, 12, 250000.0, 21602.88, 20196.63, 1406.25, 229803.37),
+    (0.0675, 6, 12, 250000.0, 21602.88, 20771.09, 831.79, 127103.27),
+    (0.0675, 12, 12, 250000.0, 21602.88, 21482.05, 120.84, 0.0),
+    (0.0675, 1, 360, 1000.0, 6.49, 0.86, 5.63, 999.14),
+    (0.0675, 6, 360, 1000.0, 6.49, 0.89, 5.6, 994.76),
+    (0.0675, 360, 360, 1000.0, 6.49, 6.45, 0.04, 0.0),
+    (0.0675, 1, 360, 250000.0, 1621.5, 215.25, 1406.25, 249784.75),
+    (0.0675, 6, 360, 250000.0, 1621.5, 221.37, 1400.13, 248690.23),
+    (0.0675, 360, 360, 250000.0, 1621.5, 1612.43, 9.07, 0.0),
+]
+
+
+@pytest.mark.parametrize('rate, nper, prin, expected', PMT)
+def test_pmt(rate, nper, prin, expected):
+    assert loot.pmt(rate, nper, prin) == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize('rate, per, nper, prin, expected', IPMT)
+def test_ipmt(rate, per, nper, prin, expected):
+    assert loot.ipmt(rate, per, nper, prin) == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize('rate, per, nper, prin, expected', PPMT)
+def test_ppmt(rate, per, nper, prin, expected):
+    assert loot.ppmt(rate, per, nper, prin) == pytest.approx(expected, rel=1e-9, abs=1e-9)
+
+
+@pytest.mark.parametrize('rate, nper, prin, expected', FV)
+def test_fv(rate, nper, prin, expected):
+    assert loot.fv(rate, nper, prin, 100.0) == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize('rate, per, nper, prin, expected', BAL)
+def test_bal(rate, per, nper, prin, expected):
+    assert loot.bal(rate, per, nper, prin) == pytest.approx(expected, abs=0.01)
+
+
+@pytest.mark.parametrize('rate, per, nper, prin, payment, principal, interest, balance', LDF)
+def test_ldf(rate, per, nper, prin, payment, principal, interest, balance):
+    row = loot.ldf(rate, nper, prin).loc[per]
+    np.testing.assert_allclose(row[['Payment', 'Principal', 'Interest', 'Balance']],
+                               [payment, principal, interest, balance], atol=0.01)
+
+
+def test_array_matches_scalar():
+    rate = np.array([0, 0.035, 0.0675])
+    per = np.array([1, 6, 12])
+    np.testing.assert_allclose(loot.pmt(rate, 12, 1000.0),
+                               [loot.pmt(r, 12, 1000.0) for r in rate])
+    np.testing.assert_allclose(loot.ipmt(rate, per, 12, 1000.0),
+                               [loot.ipmt(r, p, 12, 1000.0) for r, p in zip(rate, per)])
+    np.testing.assert_allclose(loot.ppmt(0.035, per, 12, 1000.0),
+                               [loot.ppmt(0.035, p, 12, 1000.0) for p in per])
+    np.testing.assert_allclose(loot.fv(rate, 12, 1000.0, 100.0),
+                               [loot.fv(r, 12, 1000.0, 100.0) for r in rate])
+
+
+def test_ldf_float_term():
+    pd.testing.assert_frame_equal(loot.ldf(0.035, 12.0, 1000.0), loot.ldf(0.035, 12, 1000.0))
+    with pytest.raises(ValueError):
+        loot.ldf(0.035, 12.5, 1000.0)